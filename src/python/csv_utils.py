@@ -1,10 +1,15 @@
 """Utils definitions for reading and writing csv files."""
 import csv
+import heapq
 import json
 import logging
 import re
 import sys
+import tempfile
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
 from pathlib import Path
+from typing import TextIO
 
 from movie import Movie, Rating, User
 
@@ -312,21 +317,20 @@ def read_csv_users(path_csv: Path, path_json_cap: Path) -> list[User]:
     return list_users
 
 
-def read_csv_ratings(path_csv: Path) -> list[Rating]:
-    """Read the Ratings csv given by "Over the movie". Skip the line if errors.
+def iter_csv_ratings(path_csv: Path) -> Iterator[Rating]:
+    """Read the Ratings csv given by "Over the movie" one line at a time.
+
+    Skip the line if errors. The ratings are never all kept in memory.
 
     Args:
         path_csv (Path): the path of the .csv to read.
 
-    Returns:
-        list[users]: a list an User object.
+    Yields:
+        Rating: the validated ratings, in file order.
     """
     logger = logging.getLogger(Path(__file__).stem)
     max_column_allowed, max_allowed_rating = 4, 5
-    list_rating: list[Rating] = []
     with open(path_csv, encoding="UTF-8") as file:
-        list_userid: set[int] = set()
-        list_movieid: set[int] = set()
         csv_reader = csv.DictReader(file, delimiter=",")
         for i, row in enumerate(csv_reader, start=1):
             if len(row) > max_column_allowed:
@@ -383,17 +387,12 @@ def read_csv_ratings(path_csv: Path) -> list[Rating]:
                 )
                 continue
 
-            list_movieid.add(movie_id)
-            list_userid.add(user_id)
-            list_rating.append(
-                Rating(
-                    user_id=user_id,
-                    movie_id=movie_id,
-                    rating=rating,
-                    timestamp=timestamp,
-                )
+            yield Rating(
+                user_id=user_id,
+                movie_id=movie_id,
+                rating=rating,
+                timestamp=timestamp,
             )
-    return list_rating
 
 
 def write_csv_movie(path_csv: Path, list_movies: list[Movie]) -> None:
@@ -426,3 +425,214 @@ def write_csv_movie(path_csv: Path, list_movies: list[Movie]) -> None:
                     "|".join(list_genres_current_row),
                 ]
             )
+
+
+class SortedRatings:
+    """Ratings ordered by (user_id, movie_id), built by sort_ratings.
+
+    The ratings that did not fit in memory are kept in sorted run files inside a
+    temporary directory, which is removed once the ratings have been iterated.
+    For this reason the ratings can be iterated only once.
+    """
+
+    def __init__(
+        self,
+        buffer_ratings: list[Rating],
+        list_path_runs: list[Path],
+        dir_tmp: tempfile.TemporaryDirectory[str] | None,
+        count_ratings: int,
+    ) -> None:
+        """Init the sorted ratings.
+
+        Args:
+            buffer_ratings (list[Rating]): the sorted ratings kept in memory.
+            list_path_runs (list[Path]): the sorted run files written to disk.
+            dir_tmp (tempfile.TemporaryDirectory[str] | None): the directory of the
+                run files, None if nothing has been written to disk.
+            count_ratings (int): the total number of ratings.
+        """
+        self._buffer_ratings = buffer_ratings
+        self._list_path_runs = list_path_runs
+        self._dir_tmp = dir_tmp
+        self._count_ratings = count_ratings
+        self._consumed = False
+
+    def __len__(self) -> int:
+        """Return the total number of ratings, used by tqdm as total."""
+        return self._count_ratings
+
+    def __iter__(self) -> Iterator[Rating]:
+        """Yield the ratings ordered by (user_id, movie_id).
+
+        Raises:
+            ValueError: if the ratings have already been iterated.
+
+        Yields:
+            Rating: the ratings ordered by (user_id, movie_id).
+        """
+        if self._consumed:
+            raise ValueError("The sorted ratings can be iterated only once")
+        self._consumed = True
+        try:
+            with ExitStack() as stack:
+                list_runs = [
+                    _read_ratings_run(
+                        stack.enter_context(
+                            open(path_run, encoding="UTF-8", newline="")
+                        )
+                    )
+                    for path_run in self._list_path_runs
+                ]
+                yield from heapq.merge(
+                    *list_runs, self._buffer_ratings, key=_rating_key
+                )
+        finally:
+            self._buffer_ratings = []
+            if self._dir_tmp is not None:
+                self._dir_tmp.cleanup()
+
+
+def sort_ratings(
+    ratings: Iterable[Rating],
+    max_ratings_in_memory: int = 1_000_000,
+    max_runs_per_merge: int = 64,
+) -> SortedRatings:
+    """Sort the ratings by the primary key (user_id, movie_id).
+
+    The input is fully read before returning, so any error in it (e.g. a malformed
+    csv read by iter_csv_ratings) is raised here and not while the ratings are used.
+    The ratings are read into a buffer of at most max_ratings_in_memory ratings.
+    If the input ends before the buffer is full, the buffer is sorted in memory.
+    Otherwise every full buffer is sorted and written to a temporary csv file
+    (external merge sort), so no more than max_ratings_in_memory ratings are held
+    in memory at once. The run files are merged in passes of at most
+    max_runs_per_merge files, which bounds the number of files open at once.
+
+    Args:
+        ratings (Iterable[Rating]): the ratings to sort, e.g. from iter_csv_ratings.
+        max_ratings_in_memory (int): the max number of ratings sorted in memory at once.
+        max_runs_per_merge (int): the max number of run files merged at once.
+
+    Raises:
+        ValueError: if max_ratings_in_memory is lower than 1 or
+            max_runs_per_merge is lower than 2.
+
+    Returns:
+        SortedRatings: the ratings ordered by (user_id, movie_id).
+    """
+    if max_ratings_in_memory < 1:
+        raise ValueError(
+            f"max_ratings_in_memory must be at least 1. Now is {max_ratings_in_memory}"
+        )
+    if max_runs_per_merge < 2:  # noqa: PLR2004
+        raise ValueError(
+            f"max_runs_per_merge must be at least 2. Now is {max_runs_per_merge}"
+        )
+    logger = logging.getLogger(Path(__file__).stem)
+    dir_tmp: tempfile.TemporaryDirectory[str] | None = None
+    list_path_runs: list[Path] = []
+    buffer_ratings: list[Rating] = []
+    count_ratings = 0
+    try:
+        for rating in ratings:
+            buffer_ratings.append(rating)
+            count_ratings += 1
+            if len(buffer_ratings) == max_ratings_in_memory:
+                if dir_tmp is None:
+                    dir_tmp = tempfile.TemporaryDirectory()
+                buffer_ratings.sort(key=_rating_key)
+                path_run = Path(dir_tmp.name) / f"ratings_run_{len(list_path_runs)}.csv"
+                _write_ratings_run(path_run, buffer_ratings)
+                list_path_runs.append(path_run)
+                buffer_ratings = []
+        buffer_ratings.sort(key=_rating_key)
+        if list_path_runs:
+            logger.info(
+                "Sorted %s ratings in %s runs on disk",
+                count_ratings,
+                len(list_path_runs),
+            )
+            list_path_runs = _merge_ratings_runs(list_path_runs, max_runs_per_merge)
+    except BaseException:
+        if dir_tmp is not None:
+            dir_tmp.cleanup()
+        raise
+    return SortedRatings(buffer_ratings, list_path_runs, dir_tmp, count_ratings)
+
+
+def _rating_key(rating: Rating) -> tuple[int, int]:
+    """Return the primary key (user_id, movie_id) of a rating."""
+    return rating.user_id, rating.movie_id
+
+
+def _merge_ratings_runs(
+    list_path_runs: list[Path], max_runs_per_merge: int
+) -> list[Path]:
+    """Merge the run files in passes until they are at most max_runs_per_merge.
+
+    Args:
+        list_path_runs (list[Path]): the sorted run files to merge.
+        max_runs_per_merge (int): the max number of run files merged at once.
+
+    Returns:
+        list[Path]: the remaining sorted run files.
+    """
+    count_pass = 0
+    while len(list_path_runs) > max_runs_per_merge:
+        count_pass += 1
+        list_path_merged: list[Path] = []
+        for start in range(0, len(list_path_runs), max_runs_per_merge):
+            list_path_group = list_path_runs[start : start + max_runs_per_merge]
+            path_merged = list_path_group[0].with_name(
+                f"ratings_pass_{count_pass}_run_{len(list_path_merged)}.csv"
+            )
+            with ExitStack() as stack:
+                list_runs = [
+                    _read_ratings_run(
+                        stack.enter_context(
+                            open(path_run, encoding="UTF-8", newline="")
+                        )
+                    )
+                    for path_run in list_path_group
+                ]
+                _write_ratings_run(
+                    path_merged, heapq.merge(*list_runs, key=_rating_key)
+                )
+            for path_run in list_path_group:
+                path_run.unlink()
+            list_path_merged.append(path_merged)
+        list_path_runs = list_path_merged
+    return list_path_runs
+
+
+def _write_ratings_run(path_csv: Path, ratings: Iterable[Rating]) -> None:
+    """Write already sorted ratings to a temporary csv run file.
+
+    Args:
+        path_csv (Path): the path of the csv file to write.
+        ratings (Iterable[Rating]): the sorted ratings to write.
+    """
+    with open(path_csv, mode="w", encoding="UTF-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerows(
+            (rating.user_id, rating.movie_id, rating.rating, rating.timestamp)
+            for rating in ratings
+        )
+
+
+def _read_ratings_run(file: TextIO) -> Iterator[Rating]:
+    """Read back a run file written by _write_ratings_run.
+
+    Args:
+        file (TextIO): the opened run file.
+
+    Yields:
+        Rating: the ratings of the run, in the order they were written.
+    """
+    for user_id, movie_id, rating, timestamp in csv.reader(file):
+        yield Rating(
+            user_id=int(user_id),
+            movie_id=int(movie_id),
+            rating=int(rating),
+            timestamp=int(timestamp),
+        )
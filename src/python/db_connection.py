@@ -1,7 +1,8 @@
 """Utils definitions for inserting the data into the mysql database."""
 from pathlib import Path
 
-from movie import Movie, Rating, User
+from csv_utils import SortedRatings
+from movie import Movie, User
 from mysql.connector.abstracts import MySQLConnectionAbstract
 from mysql.connector.pooling import PooledMySQLConnection
 
@@ -48,15 +49,22 @@ def load_db(
     connection: PooledMySQLConnection | MySQLConnectionAbstract,
     list_movies: list[Movie],
     list_users: list[User],
-    list_ratings: list[Rating],
+    sorted_ratings: SortedRatings,
 ) -> None:
     """Load the data into the database.
 
+    The ratings are inserted ordered by their primary key (user_id, movie_id),
+    so that InnoDB appends to the clustered index instead of splitting pages.
+    They are sorted by sort_ratings before calling this function, so that the
+    ratings csv is fully validated before the database is touched. The memory
+    used by the ratings is bounded by the max_ratings_in_memory given to
+    sort_ratings (1_000_000 by default), not by this function.
+
     Args:
         connection (PooledMySQLConnection | MySQLConnectionAbstract): the connection to use.
         list_movies (list[Movie]): a list an Movie object.
         list_users (list[User]): a list an User object.
-        list_ratings (list[Rating]): a list an Rating object.
+        sorted_ratings (SortedRatings): the Rating objects returned by sort_ratings.
     """
     with connection.cursor() as cursor:
         for movie in list_movies:
@@ -129,7 +137,7 @@ def load_db(
 
     list_movies_id: set[int] = {movie.movie_id for movie in list_movies}
     with connection.cursor() as cursor:
-        for rating in tqdm(list_ratings):
+        for rating in tqdm(sorted_ratings):
             if rating.movie_id not in list_movies_id:
                 continue
             cursor.execute(
@@ -6,7 +6,12 @@ from typing import TYPE_CHECKING
 
 import coloredlogs  # type: ignore # pyright: ignore[reportMissingTypeStubs]
 import mysql.connector as myc
-from csv_utils import read_csv_movie, read_csv_ratings, read_csv_users
+from csv_utils import (
+    iter_csv_ratings,
+    read_csv_movie,
+    read_csv_users,
+    sort_ratings,
+)
 from db_connection import drop_all_tables, execute_sql_file, load_db
 
 
@@ -29,8 +34,13 @@ def main() -> None:
         path_current_folder.parent / "csv" / "input" / "users.csv",
         path_current_folder.parent / "csv" / "input" / "comuni.json",
     )
-    list_ratings = read_csv_ratings(
-        path_current_folder.parent / "csv" / "input" / "ratings.csv",
+    list_movies_id = {movie.movie_id for movie in list_movies}
+    sorted_ratings = sort_ratings(
+        rating
+        for rating in iter_csv_ratings(
+            path_current_folder.parent / "csv" / "input" / "ratings.csv",
+        )
+        if rating.movie_id in list_movies_id
     )
     connection: PooledMySQLConnection | MySQLConnectionAbstract = myc.connect(
         host="localhost", user="root", password="root", database="over_the_movie_dev"
@@ -46,7 +56,7 @@ def main() -> None:
         connection=connection,
         list_movies=list_movies,
         list_users=list_users,
-        list_ratings=list_ratings,
+        sorted_ratings=sorted_ratings,
     )
 
 